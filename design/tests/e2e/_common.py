@@ -0,0 +1,213 @@
+"""
+Helpers shared by the CRUD and query end-to-end tests: the pooled HTTP session
+factory, JSON encoding/decoding and protobuf Any value decoding.
+"""
+
+import base64
+import binascii
+import json
+import logging
+import os
+import re
+import sys
+from functools import lru_cache
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional; fall back to the stdlib encoder/decoder
+    orjson = None
+
+try:
+    from google.protobuf.message import DecodeError
+    from google.protobuf.wrappers_pb2 import StringValue
+except ImportError:
+    # protobuf is optional; fall back to walking the StringValue bytes by hand
+    StringValue = None
+
+# Set E2E_VERBOSE=1 to log debug output, including pretty-printed response bodies.
+# Under pytest the records show up with the captured logs of a failing test, or
+# live with -o log_cli=true; under plain unittest they go to stderr.
+VERBOSE = os.getenv('E2E_VERBOSE') == '1'
+if VERBOSE:
+    logging.basicConfig(format="%(message)s")
+
+_loads = orjson.loads if orjson else json.loads
+
+_STRING_VALUE_URL = sys.intern('type.googleapis.com/google.protobuf.StringValue')
+
+_HEX_RE = re.compile(r'\A[0-9a-fA-F]+\Z')
+
+def _read_varint(buf, pos):
+    """Read a protobuf base-128 varint from buf at pos and return (value, next_pos)."""
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(buf):
+            raise ValueError("Truncated varint in protobuf payload")
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+def _skip_field(buf, pos, field_number, wire_type):
+    """Skip the value of a field whose tag has just been read and return the position after it."""
+    if wire_type == 0:
+        _, pos = _read_varint(buf, pos)
+        return pos
+    if wire_type in (1, 5):
+        end = pos + (8 if wire_type == 1 else 4)
+    elif wire_type == 2:
+        length, pos = _read_varint(buf, pos)
+        end = pos + length
+    elif wire_type == 3:
+        # A group runs until the end-group tag with the same field number
+        while True:
+            tag, pos = _read_varint(buf, pos)
+            if tag & 0x07 == 4:
+                if tag >> 3 != field_number:
+                    raise ValueError("Mismatched end-group tag in protobuf payload")
+                return pos
+            pos = _skip_field(buf, pos, tag >> 3, tag & 0x07)
+    else:
+        raise ValueError(f"Unexpected wire type {wire_type} in protobuf payload")
+    if end > len(buf):
+        raise ValueError("Truncated field in protobuf payload")
+    return end
+
+def _parse_string_value(buf):
+    """
+    Parse a serialized StringValue the way protobuf does: walk every field to the
+    end of the buffer, keep the last length-delimited value of field 1 and skip
+    anything else. Truncated or corrupt input raises ValueError.
+    """
+    view = memoryview(buf)
+    result = ''
+    pos = 0
+    while pos < len(buf):
+        tag, pos = _read_varint(buf, pos)
+        field_number, wire_type = tag >> 3, tag & 0x07
+        if field_number == 0:
+            raise ValueError("Invalid field number 0 in protobuf payload")
+        end = _skip_field(buf, pos, field_number, wire_type)
+        if field_number == 1 and wire_type == 2:
+            # Rewind past the length prefix; decode straight from a view so the
+            # string bytes are not copied first
+            _, start = _read_varint(buf, pos)
+            result = str(view[start:end], 'utf-8')
+        pos = end
+    return result
+
+@lru_cache(maxsize=1024)
+def _decode_string_value(value):
+    """Decode the encoded bytes of a StringValue Any, or return None if they are not a StringValue."""
+    # The server hex-encodes the Any payload; only fall back to base64
+    # when the value is not a well-formed hex string.
+    if len(value) % 2 == 0 and _HEX_RE.match(value):
+        binary_data = binascii.unhexlify(value)
+    else:
+        binary_data = base64.b64decode(value)
+    # An empty StringValue serializes to no bytes at all
+    if not binary_data:
+        return ''
+    # Anything not starting with the 0A tag (field 1, length-delimited) is not a StringValue payload
+    if binary_data[0] != 0x0A:
+        return None
+    if StringValue is not None:
+        # Let protobuf's C extension parse the message when it is available
+        try:
+            return StringValue.FromString(binary_data).value
+        except DecodeError as e:
+            raise ValueError(f"Invalid StringValue payload: {e}") from e
+    return _parse_string_value(binary_data)
+
+def get_logger(name):
+    """Return the logger for a test module, enabling its debug output when E2E_VERBOSE=1."""
+    logger = logging.getLogger(name)
+    if VERBOSE:
+        logger.setLevel(logging.DEBUG)
+    return logger
+
+class E2EError(Exception):
+    """Raised when an API call returns an unexpected response."""
+    pass
+
+class CrudTestUtils:
+
+    @staticmethod
+    def decode_protobuf_any_value(any_value):
+        """
+        Decode a protobuf Any value to get the actual string value.
+
+        The APIs return Any values as {"typeUrl": ..., "value": <encoded bytes>}
+        dicts, so that case is checked first. Values that are already plain strings
+        or bytes are passed through; JSON text is never re-parsed here.
+        """
+        if isinstance(any_value, dict):
+            if 'value' not in any_value or 'typeUrl' not in any_value:
+                return any_value
+            if any_value['typeUrl'] == _STRING_VALUE_URL:
+                try:
+                    decoded = _decode_string_value(any_value['value'])
+                    if decoded is not None:
+                        return decoded
+                except (ValueError, binascii.Error) as e:
+                    print(f"Failed to decode protobuf value: {e}")
+            # Return the raw payload if decoding fails
+            return any_value['value']
+        # Values the server has already decoded need no further work
+        if isinstance(any_value, bytes):
+            return any_value.decode('utf-8')
+        return any_value
+
+def create_session(headers, pool_maxsize=8):
+    """Create a pooled HTTP session so every call reuses the same keep-alive connections."""
+    session = requests.Session()
+    # Retry transient gateway errors so a single blip doesn't fail the whole run.
+    # POST is left out: a create that reached the server but lost its response
+    # would be sent again and fail with a misleading "already exists" error.
+    retry = Retry(
+        total=3,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(["GET", "PUT"]),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(headers)
+    return session
+
+class PrettyJson:
+    """
+    Defers pretty-printing a JSON body (or a response's body) until a log
+    record actually needs it, so disabled debug logging costs no encoding.
+    """
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __str__(self):
+        obj = self.obj
+        if isinstance(obj, requests.Response):
+            obj = decode_json(obj)
+        return json.dumps(obj, indent=2)
+
+def encode_json(payload):
+    """Serialize a request payload to UTF-8 JSON bytes."""
+    if orjson:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+def decode_json(response):
+    """Parse a JSON response body straight from its raw bytes."""
+    return _loads(response.content)
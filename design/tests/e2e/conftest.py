@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def http():
+    """The pooled requests.Session shared by the query tests, closed when the run ends."""
+    # Imported here so runs that don't use the query tests never build their session
+    import basic_query_tests
+
+    yield basic_query_tests.SESSION
+    basic_query_tests.SESSION.close()
+
+
+@pytest.fixture(scope="session")
+def seeded_entity(http, tmp_path_factory):
+    """Create the query test entities once for the whole test run."""
+    import basic_query_tests
+
+    if "PYTEST_XDIST_WORKER" not in os.environ:
+        basic_query_tests.ensure_entities()
+        return
+
+    # Under pytest-xdist every worker gets its own session fixtures, so the
+    # workers agree through sentinel files in the shared temp directory. The
+    # first worker to take the lock seeds. If it fails, it records the error,
+    # and later workers report that error instead of re-POSTing the fixed IDs
+    # and failing with a misleading "already exists".
+    # fcntl is POSIX-only, so it is only needed once workers are in play.
+    import fcntl
+
+    shared_tmp = tmp_path_factory.getbasetemp().parent
+    seeded = shared_tmp / "query_entities.seeded"
+    failed = shared_tmp / "query_entities.failed"
+    with open(shared_tmp / "query_entities.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        if failed.exists():
+            pytest.fail(f"Seeding the query entities failed on another worker:\n{failed.read_text()}", pytrace=False)
+        if not seeded.exists():
+            try:
+                basic_query_tests.ensure_entities()
+            except BaseException as e:
+                failed.write_text(f"{type(e).__name__}: {e}")
+                raise
+            seeded.touch()
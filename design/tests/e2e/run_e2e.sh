@@ -1,4 +1,3 @@
 #!/bin/bash
 
-python basic_crud_tests.py
-python basic_query_tests.py
+python -m pytest -n auto --dist loadgroup test_common.py basic_crud_tests.py basic_query_tests.py
@@ -0,0 +1,102 @@
+"""
+Offline tests for the protobuf Any decoding in _common. They need no running
+services and cover both the protobuf decoder and the hand-written fallback.
+"""
+
+import base64
+
+import pytest
+
+import _common
+from _common import CrudTestUtils
+
+STRING_VALUE_URL = "type.googleapis.com/google.protobuf.StringValue"
+
+
+def _encode_string_value(text):
+    """Serialize text as a StringValue message: tag 0A, varint length, UTF-8 bytes."""
+    data = text.encode("utf-8")
+    length = len(data)
+    prefix = bytearray([0x0A])
+    while True:
+        byte = length & 0x7F
+        length >>= 7
+        if length:
+            prefix.append(byte | 0x80)
+        else:
+            prefix.append(byte)
+            break
+    return bytes(prefix) + data
+
+
+def _any(value, type_url=STRING_VALUE_URL):
+    return {"typeUrl": type_url, "value": value}
+
+
+@pytest.fixture(params=["protobuf", "fallback"])
+def decode(request, monkeypatch):
+    """decode_protobuf_any_value, forced onto either the protobuf or the hand-written decoder."""
+    if request.param == "protobuf":
+        if _common.StringValue is None:
+            pytest.skip("protobuf is not installed")
+    else:
+        monkeypatch.setattr(_common, "StringValue", None)
+    # Decoded payloads are memoized, so start each case from an empty cache
+    _common._decode_string_value.cache_clear()
+    yield CrudTestUtils.decode_protobuf_any_value
+    _common._decode_string_value.cache_clear()
+
+
+@pytest.mark.parametrize("text", ["", "a" * 127, "a" * 128, "a" * 200, "Minister of Education ✅ é"])
+def test_decodes_hex_and_base64(decode, text):
+    encoded = _encode_string_value(text)
+    assert decode(_any(encoded.hex())) == text
+    assert decode(_any(encoded.hex().upper())) == text
+    assert decode(_any(base64.b64encode(encoded).decode())) == text
+
+
+@pytest.mark.parametrize("payload", [
+    "0805",
+    "2a03616263",
+    base64.b64encode(b"\x08\x05").decode(),
+])
+def test_mis_tagged_payload_is_returned_raw(decode, payload):
+    assert decode(_any(payload)) == payload
+
+
+@pytest.mark.parametrize("payload", [
+    "0a0561",
+    "0a80",
+    "0a0161ff",
+    "0a0161000100",
+    base64.b64encode(b"\x0a\x09ab").decode(),
+])
+def test_truncated_payload_is_returned_raw(decode, payload):
+    assert decode(_any(payload)) == payload
+
+
+def test_invalid_utf8_is_returned_raw(decode):
+    assert decode(_any("0a0261ff")) == "0a0261ff"
+
+
+def test_repeated_field_keeps_last_value(decode):
+    assert decode(_any("0a01610a0162")) == "b"
+
+
+def test_unknown_fields_are_skipped(decode):
+    assert decode(_any("0a016110051a0178")) == "a"
+    assert decode(_any("0a01610805")) == "a"
+    assert decode(_any("0a01610b0c")) == "a"
+
+
+def test_type_url_must_match_exactly(decode):
+    payload = _encode_string_value("hello").hex()
+    assert decode(_any(payload, STRING_VALUE_URL + "Extra")) == payload
+    assert decode(_any(payload, "type.googleapis.com/google.protobuf.Int32Value")) == payload
+
+
+def test_non_any_values_pass_through(decode):
+    assert decode({"key": "source"}) == {"key": "source"}
+    assert decode("already decoded") == "already decoded"
+    assert decode(b"bytes value") == "bytes value"
+    assert decode(42) == 42